@@ -11,14 +11,166 @@ prepare_portfolio_qubo : Download data and formulate QUBO problem
 
 # Standard library
 from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+import hashlib
+import os
+import tempfile
+import time
 import warnings
 
 # Third-party libraries
 import numpy as np
 import pandas as pd
 import yfinance as yf
-from sklearn.covariance import LedoitWolf
+
+# Optional GPU backend for covariance estimation
+try:
+    import cupy as cp
+    CUPY_AVAILABLE = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    # Not installed, or installed without a usable CUDA device/driver
+    CUPY_AVAILABLE = False
+
+# Minimum number of assets before backend='auto' offloads to the GPU
+GPU_MIN_ASSETS = 64
+
+
+# ---------- Price Download ----------
+
+# Yahoo Finance limits the number of symbols per request
+YF_CHUNK_SIZE = 20
+
+
+def _yf_download(tickers: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Download price data, splitting large ticker lists into concurrent requests.
+
+    Lists of at most YF_CHUNK_SIZE tickers go out as a single bulk call;
+    longer lists are fetched in chunks on a thread pool and joined column-wise.
+    """
+    if len(tickers) <= YF_CHUNK_SIZE:
+        return yf.download(
+            tickers,
+            start=start_date,
+            end=end_date,
+            progress=False
+        )
+
+    chunks = [tickers[i:i + YF_CHUNK_SIZE] for i in range(0, len(tickers), YF_CHUNK_SIZE)]
+
+    with ThreadPoolExecutor(max_workers=min(8, len(chunks))) as ex:
+        frames = list(ex.map(
+            lambda chunk: yf.download(
+                chunk,
+                start=start_date,
+                end=end_date,
+                progress=False,
+                threads=False
+            ),
+            chunks
+        ))
+
+    # Give every chunk (Price, Ticker) columns before joining; a one-ticker
+    # chunk may come back with flat price columns
+    for chunk, frame in zip(chunks, frames):
+        if not isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = pd.MultiIndex.from_product([frame.columns, chunk])
+
+    return pd.concat(frames, axis=1).sort_index(axis=1)
+
+
+# ---------- Download Cache ----------
+
+# Raw yfinance downloads, one pickle per (tickers, start_date, end_date)
+CACHE_DIR = Path.home() / '.cache' / 'qaoa_portfolio'
+
+
+def _cache_path(tickers: List[str], start_date: str, end_date: str) -> Path:
+    """Cache file for a download request (ticker order does not matter)."""
+    key = hashlib.md5(f"{sorted(tickers)}|{start_date}|{end_date}".encode()).hexdigest()
+    return CACHE_DIR / f"{key}.pkl"
+
+
+def _download_prices(
+    tickers: List[str],
+    start_date: str,
+    end_date: str,
+    cache: bool,
+    cache_ttl_hours: float
+) -> pd.DataFrame:
+    """
+    Download raw price data from Yahoo Finance, reusing a fresh disk cache.
+
+    A cached file is used if it is younger than cache_ttl_hours and can be
+    read; otherwise the data is downloaded and, if non-empty, written back
+    to the cache atomically (temp file + os.replace).
+    """
+    path = _cache_path(tickers, start_date, end_date)
+
+    if cache and path.exists():
+        age_hours = (time.time() - path.stat().st_mtime) / 3600.0
+        if age_hours < cache_ttl_hours:
+            try:
+                return pd.read_pickle(path)
+            except Exception as e:
+                warnings.warn(f"Ignoring unreadable download cache {path}: {e}")
+
+    # Suppress yfinance progress output and warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        raw_data = _yf_download(tickers, start_date, end_date)
+
+    if cache and not raw_data.empty:
+        tmp_path = None
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+            os.close(fd)
+            raw_data.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            warnings.warn(f"Could not write download cache {path}: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return raw_data
+
+
+# ---------- Covariance Estimation ----------
+
+def _ledoit_wolf(X, xp=np):
+    """
+    Ledoit-Wolf shrunk covariance of the rows of X (n_samples, n_features).
+
+    Closed-form estimator shrinking the empirical covariance S towards
+    m * I with m = tr(S) / p; matches sklearn.covariance.LedoitWolf.
+    xp is the array module (numpy or cupy) X lives in.
+
+    Returns:
+        Sigma: (p, p) shrunk covariance matrix, as an xp array
+        shrinkage: shrinkage intensity in [0, 1]
+    """
+    X = X - X.mean(axis=0)
+    n, p = X.shape
+
+    S = (X.T @ X) / n
+    # Exact symmetry on every backend (a GEMM need not give it bit-for-bit)
+    S = (S + S.T) / 2.0
+    m = float(xp.trace(S)) / p
+    d2 = float(((S - m * xp.eye(p)) ** 2).sum())
+
+    # A single asset has no off-diagonal structure to shrink (as sklearn)
+    if p == 1:
+        return S, 0.0
+
+    X2 = X * X
+    b2 = min(float(((X2.T @ X2) / n - S * S).sum()) / n, d2)
+    shrinkage = 0.0 if b2 == 0 else b2 / d2
+
+    Sigma = shrinkage * m * xp.eye(p) + (1.0 - shrinkage) * S
+    return Sigma, shrinkage
 
 
 # ---------- Main Function ----------
@@ -28,7 +180,11 @@ def prepare_portfolio_qubo(
     start_date: str,
     end_date: str,
     B: int,
-    lambda_param: float = 5.0
+    lambda_param: float = 5.0,
+    cache: bool = True,
+    cache_ttl_hours: float = 24.0,
+    backend: str = 'auto',
+    upper_triangular: bool = False
 ) -> Dict[str, Any]:
     """
     Prepare portfolio optimization QUBO problem from historical stock data.
@@ -54,12 +210,28 @@ def prepare_portfolio_qubo(
         - lambda = 1: Balanced
         - lambda = 5: Conservative (prioritize risk minimization)
         - lambda > 10: Very conservative
+    cache : bool, optional
+        Reuse downloaded price data from ~/.cache/qaoa_portfolio.
+        Default is True.
+    cache_ttl_hours : float, optional
+        Maximum age of a cached download before it is refreshed.
+        Default is 24.0.
+    backend : str, optional
+        Array backend for the covariance estimate: 'numpy', 'cupy', or
+        'auto' (CuPy if a GPU is available and at least GPU_MIN_ASSETS tickers).
+        Default is 'auto'.
+    upper_triangular : bool, optional
+        Return Q in upper-triangular canonical form (Q[i, j] + Q[j, i]
+        stored for i < j, zero lower triangle). x^T Q x is unchanged.
+        Keep False for solvers that require a symmetric Q (e.g. cvxpy
+        quad_form). Default is False.
 
     Returns
     -------
     dict
         Dictionary containing:
-        - 'Q' : np.ndarray (n, n) - QUBO quadratic matrix
+        - 'Q' : np.ndarray (n, n) - QUBO quadratic matrix (symmetric, or
+          upper-triangular if upper_triangular=True)
         - 'q' : np.ndarray (n,) - QUBO linear vector
         - 'mu' : np.ndarray (n,) - Expected daily returns
         - 'Sigma' : np.ndarray (n, n) - Daily covariance matrix (Ledoit-Wolf)
@@ -77,6 +249,7 @@ def prepare_portfolio_qubo(
         If tickers list is empty
         If date format is invalid
         If lambda_param <= 0
+        If backend is unknown, or 'cupy' without CuPy and a CUDA device
     RuntimeError
         If data download fails
         If insufficient data is available
@@ -119,6 +292,12 @@ def prepare_portfolio_qubo(
     if lambda_param <= 0:
         raise ValueError(f"lambda_param must be positive, got {lambda_param}")
 
+    # Validate backend
+    if backend not in ('auto', 'numpy', 'cupy'):
+        raise ValueError(f"backend must be 'auto', 'numpy' or 'cupy', got {backend!r}")
+    if backend == 'cupy' and not CUPY_AVAILABLE:
+        raise ValueError("backend='cupy' requires CuPy and a CUDA device")
+
     # Validate date format
     try:
         datetime.strptime(start_date, '%Y-%m-%d')
@@ -129,15 +308,13 @@ def prepare_portfolio_qubo(
     # ========== Step 2: Download Price Data ==========
 
     try:
-        # Suppress yfinance progress output
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            raw_data = yf.download(
-                tickers,
-                start=start_date,
-                end=end_date,
-                progress=False
-            )
+        raw_data = _download_prices(
+            tickers,
+            start_date,
+            end_date,
+            cache,
+            cache_ttl_hours
+        )
 
         if raw_data.empty:
             raise RuntimeError("No data downloaded. Check tickers and date range.")
@@ -199,9 +376,10 @@ def prepare_portfolio_qubo(
 
     # ========== Step 4: Calculate Log Returns ==========
 
-    # Calculate daily log returns
-    returns = np.log(data / data.shift(1)).dropna()
-    
+    # Calculate daily log returns on the raw array (prices are already gap-free)
+    logret = np.diff(np.log(data.values), axis=0)
+    returns = pd.DataFrame(logret, index=data.index[1:], columns=data.columns)
+
     # Store actual date range
     actual_start = returns.index[0].strftime('%Y-%m-%d')
     actual_end = returns.index[-1].strftime('%Y-%m-%d')
@@ -210,14 +388,17 @@ def prepare_portfolio_qubo(
     # ========== Step 5: Covariance Estimation ==========
 
     # Sample covariance (for comparison)
-    Sigma_sample = returns.cov().values
-
-    # Ledoit-Wolf shrinkage estimator
-    lw = LedoitWolf()
-    Sigma_lw = lw.fit(returns).covariance_
-
-    # Extract shrinkage intensity
-    shrinkage_intensity = lw.shrinkage_
+    Sigma_sample = np.atleast_2d(np.cov(logret, rowvar=False))
+
+    # Ledoit-Wolf shrinkage estimator (GPU offload for large universes)
+    use_gpu = backend == 'cupy' or (
+        backend == 'auto' and CUPY_AVAILABLE and len(tickers) >= GPU_MIN_ASSETS
+    )
+    if use_gpu:
+        Sigma_lw, shrinkage_intensity = _ledoit_wolf(cp.asarray(logret), xp=cp)
+        Sigma_lw = cp.asnumpy(Sigma_lw)
+    else:
+        Sigma_lw, shrinkage_intensity = _ledoit_wolf(logret)
 
     # Calculate condition numbers for metadata
     cond_sample = np.linalg.cond(Sigma_sample)
@@ -225,7 +406,7 @@ def prepare_portfolio_qubo(
 
     # Use Ledoit-Wolf estimate
     Sigma = Sigma_lw
-    mu = returns.mean().values
+    mu = logret.mean(axis=0)
 
     # ========== Step 6: QUBO Formulation ==========
 
@@ -233,13 +414,12 @@ def prepare_portfolio_qubo(
     Q = lambda_param * (B ** 2) * Sigma
     q = -(1.0 / B) * mu
 
-    # Check Q matrix symmetry
-    is_symmetric = np.allclose(Q, Q.T)
+    # Sigma (and thus Q) is symmetric by construction: _ledoit_wolf symmetrizes S
+    is_symmetric = True
 
-    # Validate QUBO construction
-    if not is_symmetric:
-        warnings.warn("QUBO matrix Q is not symmetric. Symmetrizing...")
-        Q = (Q + Q.T) / 2.0
+    # Fold into upper-triangular canonical form
+    if upper_triangular:
+        Q = np.triu(Q, 1) + np.tril(Q, -1).T + np.diag(np.diag(Q))
 
     # ========== Step 7: Build Metadata ==========
 
@@ -252,7 +432,9 @@ def prepare_portfolio_qubo(
         'condition_number_lw': float(cond_lw),
         'download_timestamp': datetime.now().isoformat(),
         'n_assets': len(tickers),
-        'Q_is_symmetric': bool(is_symmetric)
+        'covariance_backend': 'cupy' if use_gpu else 'numpy',
+        'Q_is_symmetric': bool(is_symmetric) and not upper_triangular,
+        'Q_form': 'upper' if upper_triangular else 'symmetric'
     }
 
     # ========== Step 8: Return Dictionary ==========
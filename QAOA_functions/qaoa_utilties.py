@@ -1,14 +1,54 @@
-from typing import List, Tuple
+import os
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
 import numpy as np
+from joblib import Parallel, delayed
+from scipy.optimize import OptimizeResult, minimize
 from qiskit import QuantumCircuit
 from qiskit.circuit import Parameter
 from qiskit.circuit.library import RZZGate, RXXGate, RYYGate
-from qiskit.quantum_info import Statevector
+from qiskit.primitives import StatevectorEstimator
+from qiskit.quantum_info import SparsePauliOp
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Subspace size above which the Numba kernel's ~1 s JIT compile beats einsum
+NUMBA_MIN_STATES = 1_000_000
+
+try:
+    import cupy as cp
+    CUPY_AVAILABLE = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    # Not installed, or installed without a usable CUDA device/driver
+    CUPY_AVAILABLE = False
+
+# Batch size (D * M amplitudes) below which 'auto' keeps expectation_batch on NumPy
+GPU_MIN_STATES = 1 << 18
 
 
 # ---------- QUBO -> Ising (Z) ----------
 # x_i = (1 - Z_i)/2 ; x_i x_j = (1 - Z_i - Z_j + Z_iZ_j)/4
 
+def qubo_upper_triangular(Q: np.ndarray) -> np.ndarray:
+    """
+    Fold a QUBO matrix into upper-triangular canonical form.
+
+    Q_ut[i, j] = Q[i, j] + Q[j, i] for i < j, Q_ut[i, i] = Q[i, i] and the
+    lower triangle is zero, so x^T Q_ut x == x^T Q x for every x.
+
+    Parameters
+    ----------
+    Q : np.ndarray (n, n)
+        QUBO interaction matrix (any form).
+    """
+    Q = np.asarray(Q, dtype=float)
+    return np.triu(Q, 1) + np.tril(Q, -1).T + np.diag(np.diag(Q))
+
+
 def qubo_to_ising(Q: np.ndarray, q: np.ndarray, n: int):
     """
     Convert QUBO to Ising Hamiltonian.
@@ -16,29 +56,44 @@ def qubo_to_ising(Q: np.ndarray, q: np.ndarray, n: int):
     Parameters
     ----------
     Q : np.ndarray (n, n)
-        Symmetric QUBO interaction matrix.
+        QUBO interaction matrix, either symmetric or upper-triangular.
+        The lower triangle is folded onto the upper one, so both forms
+        give the same Hamiltonian.
     q : np.ndarray (n,)
         Linear QUBO coefficient vector.
     n : int
         Number of variables / qubits.
     """
+    Qu = qubo_upper_triangular(Q)
+    q = np.asarray(q, dtype=float)
+
+    # Off-diagonal couplings Q[i, j] + Q[j, i] for i < j
+    iu = np.triu_indices(n, k=1)
+    Qij = Qu[iu]
+    diag = np.diag(Qu)
+
     J = np.zeros((n, n))
-    h = np.zeros(n)
-    const = 0.0
+    J[iu] = Qij / 4.0
+
+    # Each coupling contributes -Qij/4 to both of its endpoints
+    h = -(J.sum(axis=1) + J.sum(axis=0)) - (diag / 2.0) - (q / 2.0)
+    const = Qij.sum() / 4.0 + diag.sum() / 2.0 + q.sum() / 2.0
 
-    for i in range(n):
-        for j in range(i + 1, n):
-            Jij = Q[i, j] / 4.0
-            J[i, j] = Jij
-            h[i] += -Q[i, j] / 4.0
-            h[j] += -Q[i, j] / 4.0
-            const += Q[i, j] / 4.0
+    return J, h, float(const)
 
-    for i in range(n):
-        h[i] += -(Q[i, i] / 2.0) - (q[i] / 2.0)
-        const += (Q[i, i] / 2.0) + (q[i] / 2.0)
 
-    return J, h, const
+def ising_coupling_pairs(J: np.ndarray, tol: float = 1e-15) -> np.ndarray:
+    """
+    Upper-triangle pairs (i, j), i < j, with |J_ij| > tol, in row-major order.
+
+    Parameters
+    ----------
+    J : np.ndarray (n, n)
+        Ising coupling matrix.
+    tol : float
+        Couplings at or below this magnitude are treated as zero.
+    """
+    return np.argwhere(np.triu(np.abs(J) > tol, k=1))
 
 
 # ---------- QAOA ansatz with XY mixer (ring) ----------
@@ -75,6 +130,7 @@ def build_qaoa_xy(n: int, P: int, J: np.ndarray,
     betas = [Parameter(f"β_{k}") for k in range(P)]
 
     ring_pairs = [(i, (i + 1) % n) for i in range(n)]
+    coupling_pairs = ising_coupling_pairs(J)
 
     for k in range(P):
         γ = gammas[k]
@@ -84,10 +140,8 @@ def build_qaoa_xy(n: int, P: int, J: np.ndarray,
             if abs(h[i]) > 1e-15:
                 qc.rz(2.0 * γ * h[i], i)
 
-        for i in range(n):
-            for j in range(i + 1, n):
-                if abs(J[i, j]) > 1e-15:
-                    qc.append(RZZGate(2.0 * γ * J[i, j]), [i, j])
+        for i, j in coupling_pairs:
+            qc.append(RZZGate(2.0 * γ * J[i, j]), [int(i), int(j)])
 
         # XY mixer (preserves cardinality)
         for (i, j) in ring_pairs:
@@ -115,18 +169,19 @@ def f_qubo(x: np.ndarray, Q: np.ndarray, q: np.ndarray) -> float:
     return float(x @ Q @ x + q @ x)
 
 
-def bitstr_from_int(k: int, n: int):
+def bitstr_from_int(k, n: int):
     """
-    Convert integer to binary array.
+    Convert integer to binary array (most significant bit first).
 
     Parameters
     ----------
-    k : int
-        Integer in [0, 2^n).
+    k : int or array-like of int
+        Integer(s) in [0, 2^n). An array of shape (m,) gives an (m, n)
+        matrix, e.g. bitstr_from_int(np.arange(2**n), n) for all bitvectors.
     n : int
         Number of bits.
     """
-    return np.array(list(np.binary_repr(k, width=n)), dtype=int)
+    return (np.asarray(k)[..., None] >> np.arange(n - 1, -1, -1)) & 1
 
 
 def bitarray_from_qiskit_string(s: str) -> np.ndarray:
@@ -141,7 +196,8 @@ def bitarray_from_qiskit_string(s: str) -> np.ndarray:
     return np.array(list(s[::-1]), dtype=int)
 
 
-def random_theta(P: int, rng: np.random.Generator) -> np.ndarray:
+def random_theta(P: int, rng: np.random.Generator,
+                 n_starts: Optional[int] = None) -> np.ndarray:
     """
     Generate random initial parameters.
 
@@ -151,11 +207,16 @@ def random_theta(P: int, rng: np.random.Generator) -> np.ndarray:
         QAOA depth.
     rng : np.random.Generator
         NumPy random number generator.
+    n_starts : int, optional
+        If given, draw all starting points up front as an (n_starts, 2P)
+        array, one restart per row, so the restart set does not depend on
+        the order in which restarts are run.
     """
+    size = P if n_starts is None else (n_starts, P)
     return np.concatenate([
-        rng.uniform(0.0, 2.0 * np.pi, size=P),
-        rng.uniform(0.0, 2.0 * np.pi, size=P),
-    ])
+        rng.uniform(0.0, 2.0 * np.pi, size=size),
+        rng.uniform(0.0, 2.0 * np.pi, size=size),
+    ], axis=-1)
 
 
 def bind_params(circ: QuantumCircuit, mapping: dict[Parameter, float]):
@@ -180,31 +241,627 @@ def bind_params(circ: QuantumCircuit, mapping: dict[Parameter, float]):
 def is_valid(x: np.ndarray, B: int) -> bool:
     return np.sum(x) == B
 
-# ---------- Exact expectation via statevector ----------
+# ---------- Expectation via Qiskit Estimator primitive ----------
+
+def ising_sparse_pauli_op(J: np.ndarray, h: np.ndarray,
+                          const: float = 0.0) -> SparsePauliOp:
+    """
+    Build the cost Hamiltonian H_C as a SparsePauliOp.
+
+    H_C = sum_i h_i Z_i + sum_{i<j} J_ij Z_i Z_j + const, so with the
+    const returned by qubo_to_ising its expectation is the QUBO cost.
+
+    Parameters
+    ----------
+    J : np.ndarray (n, n)
+        Ising coupling matrix (upper triangle is used).
+    h : np.ndarray (n,)
+        Local Ising fields.
+    const : float
+        Constant energy offset.
+    """
+    n = len(h)
+    terms = [("Z", [i], h[i]) for i in range(n) if abs(h[i]) > 1e-15]
+    terms += [("ZZ", [int(i), int(j)], J[i, j]) for i, j in ising_coupling_pairs(J)]
+    terms.append(("", [], const))
+
+    return SparsePauliOp.from_sparse_list(terms, num_qubits=n).simplify()
+
+
+def expectation_estimator(thetas: np.ndarray, ansatz: QuantumCircuit,
+                          theta_params: List[Parameter], H_cost: SparsePauliOp,
+                          estimator=None) -> np.ndarray:
+    """
+    Evaluate <H_cost> for one or many parameter vectors in a single run().
+
+    The circuit is bound through the primitive's parameter_values array
+    instead of building a new circuit per evaluation, so a batch of
+    thetas (e.g. finite-difference stencils or restarts) costs one
+    dispatch. For hardware estimators pass the circuit transpiled once
+    and H_cost.apply_layout(ansatz.layout).
+
+    Parameters
+    ----------
+    thetas : np.ndarray (2P,) or (M, 2P)
+        Variational parameters, one vector per row.
+    ansatz : QuantumCircuit
+        Parameterized QAOA circuit (without measurements).
+    theta_params : List[Parameter]
+        Circuit parameters, in the same order as the columns of thetas.
+    H_cost : SparsePauliOp
+        Cost Hamiltonian, e.g. from ising_sparse_pauli_op.
+    estimator : BaseEstimatorV2, optional
+        Estimator primitive. Default: StatevectorEstimator().
+
+    Returns:
+        evs: (M,) expectation values
+    """
+    if estimator is None:
+        estimator = StatevectorEstimator()
+
+    thetas = np.atleast_2d(np.asarray(thetas, dtype=float))
+    pub = (ansatz, H_cost, {tuple(theta_params): thetas})
+
+    return np.asarray(estimator.run([pub]).result()[0].data.evs)
+
+
+# ---------- Fixed-cardinality (XY) subspace simulator ----------
+# The XY mixer preserves Hamming weight, so starting from |x| = B the state
+# never leaves the C(n, B)-dimensional subspace of weight-B basis states.
+
+# Subspace tables keyed by (n, B)
+_SUBSPACE_CACHE: Dict[tuple, tuple] = {}
+# Subspace energies keyed by (n, B, Q bytes, q bytes)
+_SUBSPACE_ENERGY_CACHE: Dict[tuple, np.ndarray] = {}
+# Subspace Ising diagonals keyed by (n, B, J bytes, h bytes)
+_SUBSPACE_ISING_CACHE: Dict[tuple, np.ndarray] = {}
+# Mixer pair tables copied to the GPU, keyed by (n, B)
+_DEVICE_PAIRS_CACHE: Dict[tuple, list] = {}
+
+
+def xy_subspace(n: int, B: int):
+    """
+    Enumerate the weight-B subspace and the XY ring-mixer pair tables.
+
+    Parameters
+    ----------
+    n : int
+        Number of qubits.
+    B : int
+        Hamming weight (cardinality) of the subspace.
+
+    Returns:
+        basis: (D,) sorted basis-state integers (little-endian, qubit i = bit i)
+        bits: (D, n) 0/1 matrix, bits[k, i] = qubit i of basis[k]
+        pairs: list of (i, j, idx, partner) per ring pair, where idx are the
+            subspace indices whose bits i and j differ and partner[m] is the
+            index of basis[idx[m]] with bits i and j swapped
+    """
+    key = (n, int(B))
+    if key in _SUBSPACE_CACHE:
+        return _SUBSPACE_CACHE[key]
+
+    basis = np.array(sorted(sum(1 << i for i in c) for c in combinations(range(n), B)),
+                     dtype=np.int64)
+    bits = ((basis[:, None] >> np.arange(n)) & 1).astype(np.int8)
+
+    pairs = []
+    for (i, j) in [(i, (i + 1) % n) for i in range(n)]:
+        idx = np.nonzero(bits[:, i] != bits[:, j])[0]
+        partner = np.searchsorted(basis, basis[idx] ^ ((1 << i) | (1 << j)))
+        pairs.append((i, j, idx, partner))
+
+    _SUBSPACE_CACHE[key] = (basis, bits, pairs)
+    return _SUBSPACE_CACHE[key]
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True)
+    def _qubo_energies_numba(bits, Qu, q):
+        D, n = bits.shape
+        E = np.zeros(D)
+        for k in prange(D):
+            e = 0.0
+            for i in range(n):
+                if bits[k, i]:
+                    e += q[i]
+                    for j in range(i, n):
+                        if bits[k, j]:
+                            e += Qu[i, j]
+            E[k] = e
+        return E
+
+
+def qubo_subspace_energies(Q: np.ndarray, q: np.ndarray, B: int) -> np.ndarray:
+    """
+    QUBO objective for every basis state of the weight-B subspace.
+
+    Uses a NumPy contraction, switching to a parallel Numba kernel once the
+    subspace holds at least NUMBA_MIN_STATES states and Numba is installed.
+
+    Parameters
+    ----------
+    Q : np.ndarray (n, n)
+        QUBO interaction matrix.
+    q : np.ndarray (n,)
+        Linear QUBO coefficient vector.
+    B : int
+        Cardinality constraint.
+    """
+    Q = np.asarray(Q, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    n = len(q)
+
+    key = (n, int(B), Q.tobytes(), q.tobytes())
+    if key not in _SUBSPACE_ENERGY_CACHE:
+        bits = xy_subspace(n, B)[1]
+        if NUMBA_AVAILABLE and len(bits) >= NUMBA_MIN_STATES:
+            # Upper-triangular form halves the inner loop
+            E = _qubo_energies_numba(bits, qubo_upper_triangular(Q), q)
+        else:
+            X = bits.astype(np.float64)
+            E = np.einsum('ki,ij,kj->k', X, Q, X) + X @ q
+        _SUBSPACE_ENERGY_CACHE[key] = E
+
+    return _SUBSPACE_ENERGY_CACHE[key]
+
+
+def simulator_dtype(cond_number: float, max_cond: float = 1e6):
+    """
+    Statevector dtype for the subspace simulator given cond(Sigma).
+
+    complex64 halves memory traffic and is accurate enough while the
+    covariance is well conditioned (e.g. metadata['condition_number_lw']
+    from prepare_portfolio_qubo); otherwise complex128.
+
+    Parameters
+    ----------
+    cond_number : float
+        Condition number of the covariance matrix.
+    max_cond : float
+        Largest condition number for which single precision is used.
+    """
+    return np.complex64 if cond_number < max_cond else np.complex128
+
+
+def ising_subspace_diagonal(J: np.ndarray, h: np.ndarray, B: int) -> np.ndarray:
+    """
+    Diagonal of H_C = sum_i h_i Z_i + sum_{i<j} J_ij Z_i Z_j on the XY subspace.
+
+    E_diag[k] = sum_i h_i s_i + sum_{i<j} J_ij s_i s_j with s = 1 - 2x the
+    Z eigenvalues of basis state k, so one cost layer exp(-iγ H_C) is a
+    single elementwise phase.
+
+    Parameters
+    ----------
+    J : np.ndarray (n, n)
+        Ising coupling matrix (upper triangle is used).
+    h : np.ndarray (n,)
+        Local Ising fields.
+    B : int
+        Hamming weight of the subspace.
+    """
+    J = np.asarray(J, dtype=np.float64)
+    h = np.asarray(h, dtype=np.float64)
+    n = len(h)
+
+    key = (n, int(B), J.tobytes(), h.tobytes())
+    if key not in _SUBSPACE_ISING_CACHE:
+        S = 1.0 - 2.0 * xy_subspace(n, B)[1]
+        pi, pj = ising_coupling_pairs(J).T
+        _SUBSPACE_ISING_CACHE[key] = S @ h + (S[:, pi] * S[:, pj]) @ J[pi, pj]
+
+    return _SUBSPACE_ISING_CACHE[key]
+
+
+def simulate_qaoa_xy(theta: np.ndarray, J: np.ndarray, h: np.ndarray,
+                     init_bits: np.ndarray, dtype=np.complex128) -> np.ndarray:
+    """
+    Statevector of the build_qaoa_xy circuit, restricted to the XY subspace.
+
+    Gives the same amplitudes as Statevector.from_instruction on the bound
+    circuit, on the weight-|init_bits| subspace only (ordered as
+    xy_subspace(n, B)[0]).
+
+    Parameters
+    ----------
+    theta : np.ndarray (2P,)
+        Variational parameters [γ_0..γ_{P-1}, β_0..β_{P-1}].
+    J : np.ndarray (n, n)
+        Ising coupling matrix.
+    h : np.ndarray (n,)
+        Local Ising fields.
+    init_bits : array-like (n,)
+        Initial computational basis state (0/1).
+    dtype : np.dtype
+        Complex dtype of the statevector (complex64 or complex128).
+    """
+    init_bits = np.asarray(init_bits, dtype=np.int64)
+    n = len(init_bits)
+    B = int(init_bits.sum())
+    P = len(theta) // 2
+    gammas, betas = theta[:P], theta[P:]
+
+    basis, _, pairs = xy_subspace(n, B)
+    real_dtype = np.finfo(dtype).dtype
+    E_diag = ising_subspace_diagonal(J, h, B).astype(real_dtype, copy=False)
+
+    psi = np.zeros(len(basis), dtype=dtype)
+    k0 = int(np.sum(init_bits << np.arange(n)))
+    psi[np.searchsorted(basis, k0)] = 1.0
+
+    for k in range(P):
+        γ = float(gammas[k])
+        β = float(betas[k])
+
+        # All RZ(2γh_i) and RZZ(2γJ_ij) gates fused: exp(-iγ H_C)
+        psi *= np.exp(-1j * γ * E_diag)
+
+        # RXX(2β) RYY(2β) is the identity on |00>, |11> and rotates
+        # |01> <-> |10> by cos(2β) I - i sin(2β) X
+        c, s = np.cos(2.0 * β).item(), np.sin(2.0 * β).item()
+        for (_, _, idx, partner) in pairs:
+            psi[idx] = c * psi[idx] - 1j * s * psi[partner]
+
+    return psi
+
+
+def expectation_statevector(theta: np.ndarray, Q: np.ndarray, q: np.ndarray,
+                            J: np.ndarray, h: np.ndarray,
+                            init_bits: np.ndarray, dtype=np.complex128) -> float:
+    """
+    Compute exact expectation value using the XY subspace simulator.
+
+    Parameters
+    ----------
+    theta : np.ndarray (2P,)
+        Numerical values of variational parameters.
+    Q : np.ndarray (n, n)
+        QUBO interaction matrix.
+    q : np.ndarray (n,)
+        Linear QUBO coefficient vector.
+    J : np.ndarray (n, n)
+        Ising coupling matrix.
+    h : np.ndarray (n,)
+        Local Ising fields.
+    init_bits : array-like (n,)
+        Initial computational basis state (0/1) with |x| = B.
+    dtype : np.dtype
+        Statevector dtype; the final reduction is always in float64.
+    """
+    B = int(np.sum(init_bits))
+    psi = simulate_qaoa_xy(theta, J, h, init_bits, dtype)
+    probs = (psi.conj() * psi).real.astype(np.float64)
+
+    return float(probs @ qubo_subspace_energies(Q, q, B))
 
-def expectation_statevector(theta: np.ndarray):
+
+def expectation_and_gradient(theta: np.ndarray, Q: np.ndarray, q: np.ndarray,
+                             J: np.ndarray, h: np.ndarray, init_bits: np.ndarray,
+                             dtype=np.complex128) -> Tuple[float, np.ndarray]:
     """
-    Compute exact expectation value using statevector simulation.
+    Exact expectation value and its gradient w.r.t. theta (adjoint method).
+
+    One forward simulation plus one backward sweep that un-applies each
+    gate to both the state and the co-state H|psi>, so the full gradient
+    costs about two expectation evaluations regardless of P. The two-term
+    parameter-shift rule does not apply here: γ and β each drive many
+    gates with non-unit coefficients.
 
     Parameters
     ----------
     theta : np.ndarray (2P,)
         Numerical values of variational parameters.
+    Q : np.ndarray (n, n)
+        QUBO interaction matrix.
+    q : np.ndarray (n,)
+        Linear QUBO coefficient vector.
+    J : np.ndarray (n, n)
+        Ising coupling matrix.
+    h : np.ndarray (n,)
+        Local Ising fields.
+    init_bits : array-like (n,)
+        Initial computational basis state (0/1) with |x| = B.
+    dtype : np.dtype
+        Statevector dtype. The value and every gradient inner product are
+        accumulated in float64, so complex64 only limits the precision of
+        the propagated states.
+
+    Returns:
+        value: <H> at theta
+        grad: (2P,) gradient [d/dγ_0.., d/dβ_0..]
+    """
+    n = len(init_bits)
+    B = int(np.sum(init_bits))
+    P = len(theta) // 2
+
+    pairs = xy_subspace(n, B)[2]
+    real_dtype = np.finfo(dtype).dtype
+    E_diag = ising_subspace_diagonal(J, h, B).astype(real_dtype, copy=False)
+
+    phi = simulate_qaoa_xy(theta, J, h, init_bits, dtype)
+    E_cost = qubo_subspace_energies(Q, q, B)
+    probs = (phi.conj() * phi).real.astype(np.float64)
+    value = float(probs @ E_cost)
+    lam = E_cost.astype(real_dtype, copy=False) * phi
+
+    # For U = exp(-iθG): dE/dθ = 2 Im <λ|G|φ>, with φ, λ taken just after U
+    grad = np.zeros(2 * P)
+    for k in reversed(range(P)):
+        γ = float(theta[k])
+        β = float(theta[P + k])
+
+        # Mixer gates in reverse; each is exp(-iβ G) with G = 2X on |01>, |10>
+        c, s = np.cos(2.0 * β).item(), np.sin(2.0 * β).item()
+        for (_, _, idx, partner) in reversed(pairs):
+            grad[P + k] += 4.0 * (lam[idx].conj() * phi[partner]).imag.sum(dtype=np.float64)
+            phi[idx] = c * phi[idx] + 1j * s * phi[partner]
+            lam[idx] = c * lam[idx] + 1j * s * lam[partner]
+
+        # Cost layer exp(-iγ E_diag)
+        grad[k] = 2.0 * (lam.conj() * (E_diag * phi)).imag.sum(dtype=np.float64)
+        phase = np.exp(1j * γ * E_diag)
+        phi *= phase
+        lam *= phase
+
+    return value, grad
+
+
+def expectation_batch(thetas: np.ndarray, Q: np.ndarray, q: np.ndarray,
+                      J: np.ndarray, h: np.ndarray, init_bits: np.ndarray,
+                      backend: str = 'auto', dtype=np.complex128) -> np.ndarray:
+    """
+    Expectation values for a batch of parameter vectors in one simulation.
+
+    All M statevectors are propagated together as a (D, M) array, so each
+    cost layer is one broadcast phase multiply and each mixer pair one
+    batched 2x2 rotation for the whole batch (e.g. restart fan-outs or
+    parameter scans). On the GPU every step is a single fused kernel.
+
+    Parameters
+    ----------
+    thetas : np.ndarray (M, 2P)
+        Variational parameters, one vector per row.
+    Q, q : np.ndarray
+        QUBO matrix and vector.
+    J, h : np.ndarray
+        Ising couplings and fields from qubo_to_ising.
+    init_bits : array-like (n,)
+        Initial computational basis state (0/1) with |x| = B.
+    backend : str
+        'numpy', 'cupy', or 'auto' (CuPy if a GPU is available and the
+        batch holds at least GPU_MIN_STATES amplitudes).
+    dtype : np.dtype
+        Statevector dtype; complex64 is recommended on the GPU.
+
+    Returns:
+        evs: (M,) float64 expectation values
+    """
+    if backend not in ('auto', 'numpy', 'cupy'):
+        raise ValueError(f"backend must be 'auto', 'numpy' or 'cupy', got {backend!r}")
+    if backend == 'cupy' and not CUPY_AVAILABLE:
+        raise ValueError("backend='cupy' requires CuPy and a CUDA device")
+
+    thetas = np.atleast_2d(np.asarray(thetas, dtype=np.float64))
+    init_bits = np.asarray(init_bits, dtype=np.int64)
+    n = len(init_bits)
+    B = int(init_bits.sum())
+    M = thetas.shape[0]
+    P = thetas.shape[1] // 2
+    real_dtype = np.finfo(dtype).dtype
+
+    basis, _, pairs = xy_subspace(n, B)
+    use_gpu = backend == 'cupy' or (
+        backend == 'auto' and CUPY_AVAILABLE and len(basis) * M >= GPU_MIN_STATES
+    )
+    xp = cp if use_gpu else np
+    if use_gpu:
+        if (n, B) not in _DEVICE_PAIRS_CACHE:
+            _DEVICE_PAIRS_CACHE[(n, B)] = [(cp.asarray(idx), cp.asarray(partner))
+                                           for (_, _, idx, partner) in pairs]
+        index_pairs = _DEVICE_PAIRS_CACHE[(n, B)]
+    else:
+        index_pairs = [(idx, partner) for (_, _, idx, partner) in pairs]
+
+    E_diag = xp.asarray(ising_subspace_diagonal(J, h, B), dtype=real_dtype)
+    E_cost = xp.asarray(qubo_subspace_energies(Q, q, B), dtype=xp.float64)
+    gammas = xp.asarray(thetas[:, :P].T, dtype=real_dtype)
+    betas = xp.asarray(thetas[:, P:].T, dtype=real_dtype)
+
+    # Basis index along rows so the mixer gathers whole contiguous rows
+    psi = xp.zeros((len(basis), M), dtype=dtype)
+    k0 = int(np.sum(init_bits << np.arange(n)))
+    psi[int(np.searchsorted(basis, k0))] = 1.0
+
+    for k in range(P):
+        psi *= xp.exp(-1j * E_diag[:, None] * gammas[k][None, :])
+
+        c = xp.cos(2.0 * betas[k])
+        s = xp.sin(2.0 * betas[k])
+        for (idx, partner) in index_pairs:
+            psi[idx] = c * psi[idx] - 1j * s * psi[partner]
+
+    probs = (psi.conj() * psi).real.astype(xp.float64)
+    evs = E_cost @ probs
+
+    return cp.asnumpy(evs) if use_gpu else evs
+
+
+def sample_qaoa_xy(theta: np.ndarray, J: np.ndarray, h: np.ndarray,
+                   init_bits: np.ndarray, shots: int,
+                   rng: np.random.Generator) -> Dict[str, int]:
+    """
+    Sample measurement outcomes directly from the XY subspace statevector.
+
+    Replaces transpiling and running the measured circuit on a simulator
+    backend; every outcome already satisfies |x| = B.
+
+    Parameters
+    ----------
+    theta : np.ndarray (2P,)
+        Variational parameters.
+    J : np.ndarray (n, n)
+        Ising coupling matrix.
+    h : np.ndarray (n,)
+        Local Ising fields.
+    init_bits : array-like (n,)
+        Initial computational basis state (0/1) with |x| = B.
+    shots : int
+        Number of samples.
+    rng : np.random.Generator
+        NumPy random number generator.
+
+    Returns:
+        counts: dict mapping Qiskit little-endian bitstrings to counts
+    """
+    n = len(init_bits)
+    basis = xy_subspace(n, int(np.sum(init_bits)))[0]
+
+    psi = simulate_qaoa_xy(theta, J, h, init_bits)
+    probs = (psi.conj() * psi).real
+    probs /= probs.sum()
+
+    draws = rng.choice(len(basis), size=shots, p=probs)
+    idx, counts = np.unique(draws, return_counts=True)
+
+    return {format(int(basis[k]), f'0{n}b'): int(c) for k, c in zip(idx, counts)}
+
+
+def best_feasible_sample(counts: Dict[str, int], Q: np.ndarray,
+                         q: np.ndarray, B: int):
+    """
+    Lowest-cost feasible bitstring among measured counts.
+
+    All bitstrings are decoded into one (m, n) matrix and their QUBO costs
+    evaluated in a single contraction, instead of per-sample tuples.
+
+    Parameters
+    ----------
+    counts : dict[str, int]
+        Qiskit little-endian bitstrings mapped to counts. Spaces between
+        registers are ignored; each key must hold exactly n bits.
+    Q : np.ndarray (n, n)
+        QUBO interaction matrix.
+    q : np.ndarray (n,)
+        Linear QUBO coefficient vector.
+    B : int
+        Cardinality constraint.
+
+    Raises:
+        ValueError: if a bitstring does not have n bits
+
+    Returns:
+        bitstring: best feasible bitstring, or None if no sample has |x| = B
+        count: its number of occurrences
+        cost: its QUBO cost
+        x: (n,) its 0/1 decision vector
+    """
+    if not counts:
+        return None, 0, np.inf, None
+
+    strings = list(counts.keys())
+    freqs = np.fromiter(counts.values(), dtype=np.int64, count=len(strings))
+
+    # Register separators carry no bits; every key must then hold n bits
+    n = len(q)
+    clean = [s.replace(' ', '') for s in strings]
+    if any(len(s) != n for s in clean):
+        raise ValueError(f"All bitstrings must have {n} bits (one per asset)")
+
+    # '0'/'1' bytes -> 0/1, reversed to qubit order
+    raw = np.frombuffer(''.join(clean).encode('ascii'), dtype=np.uint8)
+    bits = (raw.reshape(len(clean), n)[:, ::-1] - ord('0')).astype(np.int64)
+
+    feasible = np.nonzero(bits.sum(axis=1) == B)[0]
+    if len(feasible) == 0:
+        return None, 0, np.inf, None
+
+    X = bits[feasible].astype(np.float64)
+    costs = np.einsum('ki,ij,kj->k', X, Q, X) + X @ q
+    k = feasible[np.argmin(costs)]
+
+    return strings[k], int(freqs[k]), float(costs.min()), bits[k]
+
+
+# ---------- Multi-start optimization ----------
+
+def run_restart(x0: np.ndarray, Q: np.ndarray, q: np.ndarray, J: np.ndarray,
+                h: np.ndarray, init_bits: np.ndarray, options: dict,
+                method: str = 'L-BFGS-B', dtype=np.complex128) -> OptimizeResult:
+    """
+    Run one optimization of the QAOA-XY expectation from a given start.
+
+    Parameters
+    ----------
+    x0 : np.ndarray (2P,)
+        Initial parameters.
+    Q, q : np.ndarray
+        QUBO matrix and vector.
+    J, h : np.ndarray
+        Ising couplings and fields from qubo_to_ising.
+    init_bits : array-like (n,)
+        Initial computational basis state (0/1) with |x| = B.
+    options : dict
+        Optimizer options (e.g. {'maxiter': 250}).
+    method : str
+        scipy.optimize.minimize method. 'COBYLA' runs derivative-free;
+        any other method gets exact gradients from expectation_and_gradient.
+    dtype : np.dtype
+        Simulator statevector dtype (see simulator_dtype).
+    """
+    args = (Q, q, J, h, init_bits, dtype)
+
+    if method == 'COBYLA':
+        return minimize(expectation_statevector, x0, args=args,
+                        method=method, options=options)
+
+    return minimize(expectation_and_gradient, x0, args=args, jac=True,
+                    method=method, options=options)
+
+
+def optimize_qaoa_xy(Q: np.ndarray, q: np.ndarray, J: np.ndarray,
+                     h: np.ndarray, init_bits: np.ndarray, starts: np.ndarray,
+                     options: Optional[dict] = None, method: str = 'L-BFGS-B',
+                     dtype=np.complex128,
+                     n_jobs: Optional[int] = None) -> Tuple[OptimizeResult, List[OptimizeResult]]:
     """
-    bind = {p: float(t) for p, t in zip(theta_params, theta)}
-    circ_b = bind_params(ansatz, bind)
-    sv = Statevector.from_instruction(circ_b)
+    Multi-start optimization, running the restarts in parallel.
 
-    exp = 0.0
-    for idx, amp in enumerate(sv.data):
-        p = (amp.conjugate() * amp).real
-        if p < 1e-16:
-            continue
+    Each restart is independent, so they are dispatched to a joblib
+    process pool (loky backend).
 
-        x = bitstr_from_int(idx, n)
-        if x.sum() != B:
-            continue
+    Parameters
+    ----------
+    Q, q : np.ndarray
+        QUBO matrix and vector.
+    J, h : np.ndarray
+        Ising couplings and fields from qubo_to_ising.
+    init_bits : array-like (n,)
+        Initial computational basis state (0/1) with |x| = B.
+    starts : np.ndarray (n_starts, 2P)
+        Starting points, one restart per row (see random_theta).
+    options : dict, optional
+        Optimizer options passed to scipy.optimize.minimize.
+    method : str
+        Optimizer; gradient-based 'L-BFGS-B' by default, 'COBYLA' for the
+        derivative-free variant.
+    dtype : np.dtype
+        Simulator statevector dtype (see simulator_dtype).
+    n_jobs : int, optional
+        Number of worker processes. Default: min(n_starts, cpu count).
+
+    Returns:
+        best: OptimizeResult with the lowest final cost
+        results: OptimizeResult of every restart, in row order
+    """
+    options = options or {}
+    if n_jobs is None:
+        n_jobs = min(len(starts), os.cpu_count() or 1)
 
-        exp += p * f_qubo(x, Q, q)
+    results = Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(run_restart)(x0, Q, q, J, h, init_bits, options, method, dtype)
+        for x0 in starts
+    )
+    best = min(results, key=lambda r: r.fun)
 
-    return exp
+    return best, results